@@ -5,8 +5,36 @@
 """
 
 import os
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 import tiktoken
 
+# 编码器对应的远程文件地址，tiktoken 以该地址的 sha1 作为缓存文件名
+ENCODING_BLOB_URLS = {
+    "cl100k_base": "https://openaipublic.blob.core.windows.net/encodings/cl100k_base.tiktoken",
+}
+
+def is_encoding_cached(encoding_name, cache_dir):
+    """检查编码文件是否已存在于缓存目录中"""
+    blob_url = ENCODING_BLOB_URLS.get(encoding_name)
+    if not blob_url:
+        return False
+    cache_key = hashlib.sha1(blob_url.encode()).hexdigest()
+    return os.path.exists(os.path.join(cache_dir, cache_key))
+
+def download_encoding(encoding_name):
+    """下载单个编码器文件"""
+    try:
+        print(f"下载编码器: {encoding_name}")
+        encoder = tiktoken.get_encoding(encoding_name)
+        # 触发下载
+        encoder.encode("test")
+        print(f"✅ {encoding_name} 下载完成")
+        return True
+    except Exception as e:
+        print(f"❌ {encoding_name} 下载失败: {e}")
+        return False
+
 def download_tiktoken_files():
     """下载所有常用的tiktoken编码文件"""
     
@@ -28,15 +56,17 @@ def download_tiktoken_files():
         "cl100k_base"
     ]
     
+    pending = []
     for encoding_name in encodings:
-        try:
-            print(f"下载编码器: {encoding_name}")
-            encoder = tiktoken.get_encoding(encoding_name)
-            # 触发下载
-            test_tokens = encoder.encode("test")
-            print(f"✅ {encoding_name} 下载完成")
-        except Exception as e:
-            print(f"❌ {encoding_name} 下载失败: {e}")
+        if is_encoding_cached(encoding_name, cache_dir):
+            print(f"⏭️  {encoding_name} 已存在缓存，跳过下载")
+        else:
+            pending.append(encoding_name)
+    
+    if pending:
+        # 下载受网络延迟限制，并发获取各编码文件
+        with ThreadPoolExecutor(max_workers=min(8, len(pending))) as executor:
+            list(executor.map(download_encoding, pending))
     
     print("\n🎉 tiktoken编码文件下载完成！")
     
@@ -9,43 +9,201 @@
 import os
 import sys
 import json
+import mmap
+import base64
+import hashlib
+import shutil
 import argparse
+import logging
+import threading
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Sequence, Set
 
+# xxhash 用于下载后的文件完整性校验，未安装时跳过
 try:
-    from huggingface_hub import snapshot_download, login
+    import xxhash
+except ImportError:
+    xxhash = None
+
+# 大文件下载在高延迟链路上容易超时，适当放宽超时时间（秒）
+os.environ.setdefault("HF_HUB_DOWNLOAD_TIMEOUT", "60")
+os.environ.setdefault("HF_HUB_ETAG_TIMEOUT", "30")
+
+try:
+    from huggingface_hub import HfApi, hf_hub_download, snapshot_download
+    from huggingface_hub import constants as hf_constants
+    from huggingface_hub.utils import disable_progress_bars, enable_progress_bars, filter_repo_objects
+    from tqdm import tqdm
 except ImportError:
     print("请先安装 huggingface_hub: pip install huggingface_hub")
     sys.exit(1)
 
+# 增大每次读写的块大小（默认 10MB），减少大分片下载时的读写循环次数
+DOWNLOAD_CHUNK_SIZE = 32 * 1024 * 1024
+hf_constants.DOWNLOAD_CHUNK_SIZE = DOWNLOAD_CHUNK_SIZE
+
+# 计算文件校验值时每次读取的分片大小
+HASH_CHUNK_SIZE = 4 * 1024 * 1024
+
 # 模型配置
 MODEL_CONFIGS = {
     "qwen3-14b": {
         "repo_id": "Qwen/Qwen2.5-14B-Instruct",
         "description": "Qwen2.5 14B 指令微调模型",
-        "size": "约 28GB"
+        "size": "约 28GB",
+        "allow_patterns": ["*.safetensors", "*.json", "*.txt", "tokenizer*", "*.model"],
+        "ignore_patterns": ["*.bin", "*.pt", "*.pth", "*.msgpack", "*.h5"]
     },
     "bge-reranker-v2-m3": {
         "repo_id": "BAAI/bge-reranker-v2-m3",
         "description": "BGE Reranker v2 M3 模型",
-        "size": "约 2GB"
+        "size": "约 2GB",
+        "ignore_patterns": ["onnx/*", "*.onnx", "*.msgpack", "*.h5"]
     },
     "bge-m3": {
         "repo_id": "BAAI/bge-m3",
         "description": "BGE M3 嵌入模型",
-        "size": "约 2GB"
+        "size": "约 2GB",
+        "ignore_patterns": ["onnx/*", "*.onnx", "*.msgpack", "*.h5"]
     }
 }
 
+# 模型名称在运行期间不变，预先计算供查找和展示使用
+SUPPORTED_MODELS = frozenset(MODEL_CONFIGS)
+ALL_MODELS = tuple(MODEL_CONFIGS)
+SUPPORTED_MODELS_STR = ", ".join(ALL_MODELS)
+
+# 默认直接输出到 stdout，作为类库使用时也能看到提示信息；命令行运行时改为经队列输出
+_stream_handler = logging.StreamHandler(sys.stdout)
+_stream_handler.setFormatter(logging.Formatter("%(message)s"))
+
+logger = logging.getLogger("download_models")
+logger.addHandler(_stream_handler)
+logger.setLevel(logging.INFO)
+logger.propagate = False
+
+def start_log_listener() -> QueueListener:
+    """
+    日志经队列交由后台线程统一输出，避免并行下载时各线程争用 stdout
+    
+    Returns:
+        QueueListener: 已启动的日志监听器，退出前需调用 stop()
+    """
+    log_queue = queue.Queue(-1)
+    logger.removeHandler(_stream_handler)
+    logger.addHandler(QueueHandler(log_queue))
+    
+    listener = QueueListener(log_queue, _stream_handler)
+    listener.start()
+    return listener
+
+class DownloadProgress:
+    """
+    定期统计各模型已写入的字节数，用单个进度条汇总显示所有并行下载的进度
+    
+    只统计需要下载的仓库文件及其下载中的 .incomplete 文件，不依赖具体下载后端；
+    目录中被过滤掉的文件（如旧版本下载的 onnx 目录）和元数据文件不计入
+    """
+    
+    def __init__(self, model_files: Dict[Path, List[str]], total_bytes: int, interval: float = 1.0):
+        self.interval = interval
+        # 每个仓库文件的保存路径，以及 huggingface_hub 存放其 .incomplete 文件的目录和文件名前缀
+        self._targets = []
+        for local_dir, filenames in model_files.items():
+            download_dir = local_dir / ".cache" / "huggingface" / "download"
+            for filename in filenames:
+                file_path = local_dir / filename
+                incomplete_dir = (download_dir / filename).parent
+                self._targets.append((file_path, incomplete_dir, self._incomplete_key(file_path.name)))
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._bar = tqdm(total=total_bytes, unit="B", unit_scale=True, unit_divisor=1024,
+                         desc="下载进度", disable=None)
+    
+    def start(self):
+        self._refresh()
+        self._thread.start()
+    
+    def stop(self):
+        self._stop_event.set()
+        self._thread.join()
+        self._refresh()
+        self._bar.close()
+    
+    @staticmethod
+    def _incomplete_key(name: str) -> str:
+        """与 huggingface_hub 本地目录下载的命名一致：<sha1(文件名.metadata)>.<etag>.incomplete"""
+        return base64.urlsafe_b64encode(hashlib.sha1(f"{name}.metadata".encode()).digest()).decode()
+    
+    def _incomplete_sizes(self) -> Dict[tuple, int]:
+        incomplete_sizes = {}
+        for incomplete_dir in {target[1] for target in self._targets}:
+            try:
+                with os.scandir(incomplete_dir) as entries:
+                    for entry in entries:
+                        if not entry.name.endswith(".incomplete"):
+                            continue
+                        key = (incomplete_dir, entry.name.split(".", 1)[0])
+                        try:
+                            incomplete_sizes[key] = incomplete_sizes.get(key, 0) + entry.stat().st_size
+                        except OSError:
+                            # 下载完成的文件可能在统计期间被重命名
+                            pass
+            except OSError:
+                # 尚未开始下载时目录不存在
+                pass
+        return incomplete_sizes
+    
+    def _downloaded_bytes(self) -> int:
+        incomplete_sizes = self._incomplete_sizes()
+        downloaded = 0
+        for file_path, incomplete_dir, key in self._targets:
+            if (incomplete_dir, key) in incomplete_sizes:
+                downloaded += incomplete_sizes[(incomplete_dir, key)]
+                continue
+            try:
+                downloaded += file_path.stat().st_size
+            except OSError:
+                pass
+        return downloaded
+    
+    def _refresh(self):
+        self._bar.n = min(self._downloaded_bytes(), self._bar.total)
+        self._bar.refresh()
+    
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self._refresh()
+
 class ModelDownloader:
-    def __init__(self, base_dir: str = "/var/lib/docker/volumes/gpustack-data/_data/models", hf_token: Optional[str] = None):
+    def __init__(self, base_dir: str = "/var/lib/docker/volumes/gpustack-data/_data/models", hf_token: Optional[str] = None,
+                 workers: int = 16, endpoint: Optional[str] = None, verify: bool = False):
         self.base_dir = Path(base_dir)
         self.base_dir.mkdir(parents=True, exist_ok=True)
         self.hf_token = hf_token
+        self.workers = workers
+        self.endpoint = endpoint
+        self.verify = verify
+        self._model_info_cache = {}
+        # 模型信息文件在后台线程写入，不阻塞下载线程
+        self._io_pool = ThreadPoolExecutor(max_workers=2)
         
+        # login() 固定访问 huggingface.co，改为在配置的服务地址上校验令牌，并显式传给各个接口
         if self.hf_token:
-            login(token=self.hf_token)
+            HfApi(endpoint=self.endpoint, token=self.hf_token).whoami()
+    
+    def close(self):
+        """等待后台写入任务完成并释放线程池"""
+        self._io_pool.shutdown(wait=True)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
     
     def download_model(self, model_name: str, force_download: bool = False) -> bool:
         """
@@ -58,53 +216,352 @@ class ModelDownloader:
         Returns:
             bool: 下载是否成功
         """
-        if model_name not in MODEL_CONFIGS:
-            print(f"错误: 不支持的模型 '{model_name}'")
-            print(f"支持的模型: {', '.join(MODEL_CONFIGS.keys())}")
+        if model_name not in SUPPORTED_MODELS:
+            logger.error(f"错误: 不支持的模型 '{model_name}'")
+            logger.error(f"支持的模型: {SUPPORTED_MODELS_STR}")
             return False
         
         config = MODEL_CONFIGS[model_name]
         repo_id = config["repo_id"]
         local_dir = self.base_dir / model_name
+        model_info = {
+            "model_name": model_name,
+            "repo_id": repo_id,
+            "description": config["description"],
+            "local_path": str(local_dir),
+            "download_complete": True
+        }
+        
+        logger.info("\n".join([
+            f"\n开始下载模型: {model_name}",
+            f"模型描述: {config['description']}",
+            f"预计大小: {config['size']}",
+            f"Hugging Face 仓库: {repo_id}",
+            f"本地保存路径: {local_dir}",
+        ]))
         
-        print(f"\n开始下载模型: {model_name}")
-        print(f"模型描述: {config['description']}")
-        print(f"预计大小: {config['size']}")
-        print(f"Hugging Face 仓库: {repo_id}")
-        print(f"本地保存路径: {local_dir}")
+        # 只下载 gpustack 实际加载的文件格式
+        allow_patterns = config.get("allow_patterns")
+        ignore_patterns = config.get("ignore_patterns")
+        repo_files = self._get_repo_files(repo_id, allow_patterns, ignore_patterns)
+        pending_files = repo_files
         
-        # 检查模型是否已存在
+        # 检查模型是否已完整存在，只补齐缺失或不完整的文件
         if local_dir.exists() and not force_download:
-            print(f"模型已存在于 {local_dir}，使用 --force 强制重新下载")
-            return True
+            if repo_files is None:
+                logger.info(f"模型已存在于 {local_dir}，使用 --force 强制重新下载")
+                return True
+            pending_files = self._get_missing_files(local_dir, repo_files)
+            if self.verify:
+                pending_files += self._find_corrupted_files(local_dir, repo_files, pending_files)
+            if not pending_files:
+                # 旧版本脚本或未安装 xxhash 时下载的模型没有校验值，以现有文件建立校验基准
+                unhashed_files = self._get_unhashed_files(local_dir, repo_files)
+                if unhashed_files:
+                    self._io_pool.submit(self._record_model_info, local_dir, model_info, unhashed_files)
+                if self.verify and unhashed_files:
+                    logger.warning(
+                        f"⚠️ {model_name} 有 {len(unhashed_files)} 个文件没有已记录的校验值，未能校验内容，"
+                        f"已按现有文件建立校验基准"
+                    )
+                else:
+                    logger.info(f"模型已完整存在于 {local_dir}，使用 --force 强制重新下载")
+                return True
+            logger.info(f"检测到 {len(pending_files)} 个文件缺失或不完整，继续下载: {model_name}")
+        
+        # 下载前检查磁盘空间，空间不足时尽早失败
+        if pending_files and not self._has_enough_space(pending_files):
+            return False
         
         try:
-            snapshot_download(
-                repo_id=repo_id,
-                local_dir=str(local_dir),
-                local_dir_use_symlinks=False,
-                resume_download=True
-            )
-            print(f"✅ 模型 {model_name} 下载完成")
+            if pending_files:
+                # 已通过元数据得到确切的文件列表，直接逐个下载，无需再次遍历仓库
+                self._download_files(repo_id, local_dir, [f.rfilename for f in pending_files], force_download)
+            else:
+                self._call_with_fallback(
+                    snapshot_download,
+                    repo_id=repo_id,
+                    local_dir=str(local_dir),
+                    allow_patterns=allow_patterns,
+                    ignore_patterns=ignore_patterns,
+                    max_workers=self.workers,
+                    endpoint=self.endpoint,
+                    token=self.hf_token,
+                    force_download=force_download
+                )
+            logger.info(f"✅ 模型 {model_name} 下载完成")
             
             # 创建模型信息文件
-            info_file = local_dir / "model_info.json"
-            with open(info_file, 'w', encoding='utf-8') as f:
-                json.dump({
-                    "model_name": model_name,
-                    "repo_id": repo_id,
-                    "description": config["description"],
-                    "local_path": str(local_dir),
-                    "download_complete": True
-                }, f, indent=2, ensure_ascii=False)
+            self._io_pool.submit(self._record_model_info, local_dir, model_info, pending_files)
             
             return True
             
         except Exception as e:
-            print(f"❌ 下载模型 {model_name} 失败: {str(e)}")
+            logger.error(f"❌ 下载模型 {model_name} 失败: {str(e)}")
+            return False
+    
+    def _record_model_info(self, local_dir: Path, data: Dict, downloaded_files: Optional[List]):
+        """
+        计算指定文件的校验值，与已记录的校验值合并后写入模型信息文件
+        
+        Args:
+            local_dir: 模型本地目录
+            data: 模型信息
+            downloaded_files: 需要计算校验值的仓库文件列表（本次下载或尚无校验值的文件）
+        """
+        info_file = local_dir / "model_info.json"
+        file_hashes = self._load_file_hashes(info_file)
+        if xxhash is not None and downloaded_files:
+            try:
+                for sibling in downloaded_files:
+                    local_file = local_dir / sibling.rfilename
+                    if local_file.is_file():
+                        file_hashes[sibling.rfilename] = self._hash_file(local_file)
+            except Exception as e:
+                logger.warning(f"⚠️ 计算 {local_dir} 文件校验值失败: {str(e)}")
+        
+        if file_hashes:
+            data["files"] = file_hashes
+        self._write_model_info(info_file, data)
+    
+    @staticmethod
+    def _load_file_hashes(info_file: Path) -> Dict[str, str]:
+        """读取模型信息文件中记录的文件校验值"""
+        try:
+            with open(info_file, "r", encoding="utf-8") as f:
+                return json.load(f).get("files", {})
+        except (OSError, ValueError):
+            return {}
+    
+    @staticmethod
+    def _hash_file(path: Path) -> str:
+        """使用 xxh3-128 计算文件校验值，通过内存映射分片读取"""
+        hasher = xxhash.xxh3_128()
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+                    for offset in range(0, len(view), HASH_CHUNK_SIZE):
+                        hasher.update(view[offset:offset + HASH_CHUNK_SIZE])
+        return hasher.hexdigest()
+    
+    def _get_unhashed_files(self, local_dir: Path, repo_files: List) -> List:
+        """
+        找出模型信息文件中尚未记录校验值的仓库文件，未安装 xxhash 时返回空列表
+        
+        Args:
+            local_dir: 模型本地目录
+            repo_files: 仓库文件列表
+            
+        Returns:
+            List: 缺少校验值的文件列表
+        """
+        if xxhash is None:
+            return []
+        
+        file_hashes = self._load_file_hashes(local_dir / "model_info.json")
+        return [sibling for sibling in repo_files if sibling.rfilename not in file_hashes]
+    
+    def _find_corrupted_files(self, local_dir: Path, repo_files: List, missing_files: List) -> List:
+        """
+        使用模型信息文件中记录的校验值检查已下载文件，删除校验失败的文件以便重新下载
+        
+        Args:
+            local_dir: 模型本地目录
+            repo_files: 仓库文件列表
+            missing_files: 已确定需要下载的文件列表
+            
+        Returns:
+            List: 校验失败的文件列表
+        """
+        if xxhash is None:
+            logger.warning("⚠️ 未安装 xxhash，跳过文件校验: pip install xxhash")
+            return []
+        
+        file_hashes = self._load_file_hashes(local_dir / "model_info.json")
+        missing_names = {sibling.rfilename for sibling in missing_files}
+        corrupted_files = []
+        for sibling in repo_files:
+            expected = file_hashes.get(sibling.rfilename)
+            if expected is None or sibling.rfilename in missing_names:
+                continue
+            local_file = local_dir / sibling.rfilename
+            if self._hash_file(local_file) != expected:
+                logger.warning(f"⚠️ 文件校验失败，将重新下载: {local_file}")
+                # huggingface_hub 会信任本地下载记录，需删除文件才会重新下载
+                local_file.unlink()
+                corrupted_files.append(sibling)
+        
+        return corrupted_files
+    
+    def _write_model_info(self, info_file: Path, data: Dict):
+        """
+        原子写入模型信息文件，内容未变化时跳过写入
+        
+        Args:
+            info_file: 模型信息文件路径
+            data: 模型信息
+        """
+        try:
+            payload = json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+            if info_file.is_file() and info_file.read_bytes() == payload:
+                return
+            
+            # 先写临时文件再替换，避免中途异常留下不完整的文件
+            tmp_file = info_file.with_suffix(".json.tmp")
+            with open(tmp_file, "wb") as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, info_file)
+        except Exception as e:
+            logger.warning(f"⚠️ 写入模型信息文件 {info_file} 失败: {str(e)}")
+    
+    def _get_model_info(self, repo_id: str):
+        """获取仓库文件信息（含文件大小），结果按仓库缓存"""
+        if repo_id not in self._model_info_cache:
+            api = HfApi(endpoint=self.endpoint, token=self.hf_token)
+            self._model_info_cache[repo_id] = api.model_info(repo_id, files_metadata=True)
+        return self._model_info_cache[repo_id]
+    
+    def _prefetch_metadata(self, model_names: List[str]):
+        """
+        并行预取模型元数据，避免各模型在下载前依次等待网络往返
+        
+        Args:
+            model_names: 模型名称列表
+        """
+        repo_ids = [MODEL_CONFIGS[name]["repo_id"] for name in model_names if name in SUPPORTED_MODELS]
+        if not repo_ids:
+            return
+        
+        def fetch(repo_id: str):
+            try:
+                self._get_model_info(repo_id)
+            except Exception:
+                # 预取失败不影响下载，下载阶段会重新获取并报告错误
+                pass
+        
+        with ThreadPoolExecutor(max_workers=min(len(repo_ids), 4)) as executor:
+            list(executor.map(fetch, repo_ids))
+    
+    def _get_repo_files(self, repo_id: str,
+                        allow_patterns: Optional[List[str]] = None,
+                        ignore_patterns: Optional[List[str]] = None) -> Optional[List]:
+        """
+        获取仓库中需要下载的文件（含文件大小）
+        
+        Args:
+            repo_id: Hugging Face 仓库 ID
+            allow_patterns: 需要下载的文件匹配模式
+            ignore_patterns: 需要跳过的文件匹配模式
+            
+        Returns:
+            Optional[List]: 过滤后的仓库文件列表，无法获取远程信息时返回 None
+        """
+        try:
+            info = self._get_model_info(repo_id)
+        except Exception as e:
+            logger.warning(f"⚠️ 获取仓库 {repo_id} 文件信息失败: {str(e)}")
+            return None
+        
+        return list(filter_repo_objects(
+            info.siblings or [],
+            allow_patterns=allow_patterns,
+            ignore_patterns=ignore_patterns,
+            key=lambda sibling: sibling.rfilename
+        ))
+    
+    def _get_missing_files(self, local_dir: Path, repo_files: List) -> List:
+        """
+        对比远程仓库的文件大小，找出本地缺失或不完整的文件，并删除大小不符的文件以便重新下载
+        
+        Args:
+            local_dir: 模型本地目录
+            repo_files: 仓库文件列表
+            
+        Returns:
+            List: 需要下载的文件列表
+        """
+        missing_files = []
+        for sibling in repo_files:
+            local_file = local_dir / sibling.rfilename
+            if not local_file.is_file():
+                missing_files.append(sibling)
+            elif sibling.size is not None and local_file.stat().st_size != sibling.size:
+                # huggingface_hub 会信任本地下载记录，需删除文件才会重新下载
+                local_file.unlink()
+                missing_files.append(sibling)
+        
+        return missing_files
+    
+    def _has_enough_space(self, repo_files: List) -> bool:
+        """
+        检查基础目录所在磁盘是否有足够空间存放待下载的文件
+        
+        Args:
+            repo_files: 待下载的仓库文件列表
+            
+        Returns:
+            bool: 空间是否足够
+        """
+        required = sum(sibling.size or 0 for sibling in repo_files)
+        free = shutil.disk_usage(self.base_dir).free
+        if free < required:
+            logger.error(
+                f"❌ 磁盘空间不足: 需要 {required / 1024 ** 3:.1f}GB，"
+                f"可用 {free / 1024 ** 3:.1f}GB（{self.base_dir}）"
+            )
             return False
+        return True
+    
+    def _download_files(self, repo_id: str, local_dir: Path, filenames: List[str], force_download: bool = False):
+        """
+        按文件列表并发下载，所有文件固定在元数据对应的同一版本
+        
+        Args:
+            repo_id: Hugging Face 仓库 ID
+            local_dir: 模型本地目录
+            filenames: 需要下载的文件列表
+            force_download: 是否忽略本地已有文件强制重新下载
+        """
+        revision = self._get_model_info(repo_id).sha
+        
+        def download(filename: str):
+            return self._call_with_fallback(
+                hf_hub_download,
+                repo_id=repo_id,
+                filename=filename,
+                revision=revision,
+                local_dir=str(local_dir),
+                endpoint=self.endpoint,
+                token=self.hf_token,
+                force_download=force_download
+            )
+        
+        with ThreadPoolExecutor(max_workers=min(len(filenames), self.workers)) as executor:
+            list(executor.map(download, filenames))
+    
+    @staticmethod
+    def _is_hf_transfer_error(error: Exception) -> bool:
+        """
+        判断异常是否来自 hf_transfer 后端（未安装或下载过程中出错）
+        """
+        return isinstance(error, (RuntimeError, ValueError)) and "hf_transfer" in str(error)
     
-    def download_models(self, model_names: List[str], force_download: bool = False) -> Dict[str, bool]:
+    def _call_with_fallback(self, download_func, **kwargs):
+        """
+        调用下载函数，hf_transfer 后端失败时回退到默认下载器重试一次
+        """
+        try:
+            return download_func(**kwargs)
+        except Exception as e:
+            if not hf_constants.HF_HUB_ENABLE_HF_TRANSFER or not self._is_hf_transfer_error(e):
+                raise
+            logger.warning(f"⚠️ hf_transfer 下载失败 ({e})，回退到默认下载器重试")
+            hf_constants.HF_HUB_ENABLE_HF_TRANSFER = False
+            return download_func(**kwargs)
+    
+    def download_models(self, model_names: Sequence[str], force_download: bool = False) -> Dict[str, bool]:
         """
         批量下载模型
         
@@ -115,24 +572,117 @@ class ModelDownloader:
         Returns:
             Dict[str, bool]: 每个模型的下载结果
         """
-        results = {}
+        # 去重并保持原有顺序
+        model_names = list(dict.fromkeys(model_names))
+        if not model_names:
+            return {}
+        
+        # 完整性校验和磁盘空间检查都依赖仓库元数据，提前并行获取
+        self._prefetch_metadata(model_names)
+        
+        # 各模型并行下载到同一磁盘，需按全部模型的待下载总量检查空间
+        pending_files = self._get_pending_files(model_names, force_download)
+        if pending_files and not self._has_enough_space(pending_files):
+            return {model_name: False for model_name in model_names}
+        
+        progress = self._create_progress(model_names)
+        if progress:
+            # 由汇总进度条代替 huggingface_hub 的逐文件进度条
+            disable_progress_bars()
+            progress.start()
+        
+        # 各模型相互独立，且下载受网络/磁盘 I/O 限制，使用线程池并行下载
+        completed = {}
+        try:
+            with ThreadPoolExecutor(max_workers=min(len(model_names), 4)) as executor:
+                futures = {
+                    executor.submit(self.download_model, model_name, force_download): model_name
+                    for model_name in model_names
+                }
+                for future in as_completed(futures):
+                    completed[futures[future]] = future.result()
+        finally:
+            if progress:
+                progress.stop()
+                enable_progress_bars()
         
+        return {model_name: completed[model_name] for model_name in model_names}
+    
+    def _get_pending_files(self, model_names: List[str], force_download: bool) -> List:
+        """
+        汇总多个模型尚未下载完整的仓库文件
+        
+        Args:
+            model_names: 模型名称列表
+            force_download: 是否强制重新下载
+            
+        Returns:
+            List: 待下载的仓库文件列表，无法获取元数据的模型不计入
+        """
+        pending_files = []
         for model_name in model_names:
-            results[model_name] = self.download_model(model_name, force_download)
+            if model_name not in SUPPORTED_MODELS:
+                continue
+            config = MODEL_CONFIGS[model_name]
+            repo_files = self._get_repo_files(
+                config["repo_id"], config.get("allow_patterns"), config.get("ignore_patterns")
+            )
+            if repo_files is None:
+                continue
+            local_dir = self.base_dir / model_name
+            if local_dir.exists() and not force_download:
+                repo_files = self._get_missing_files(local_dir, repo_files)
+            pending_files.extend(repo_files)
+        return pending_files
+    
+    def _create_progress(self, model_names: List[str]) -> Optional[DownloadProgress]:
+        """
+        根据仓库元数据计算总字节数并创建汇总进度条
+        
+        Args:
+            model_names: 模型名称列表
+            
+        Returns:
+            Optional[DownloadProgress]: 进度条，无法获取元数据时返回 None
+        """
+        total_bytes = 0
+        model_files = {}
+        for model_name in model_names:
+            if model_name not in SUPPORTED_MODELS:
+                continue
+            config = MODEL_CONFIGS[model_name]
+            repo_files = self._get_repo_files(
+                config["repo_id"], config.get("allow_patterns"), config.get("ignore_patterns")
+            )
+            if repo_files is None:
+                return None
+            total_bytes += sum(sibling.size or 0 for sibling in repo_files)
+            model_files[self.base_dir / model_name] = [sibling.rfilename for sibling in repo_files]
         
-        return results
+        if not total_bytes:
+            return None
+        return DownloadProgress(model_files, total_bytes)
+    
+    def _get_present_models(self) -> Set[str]:
+        """一次性读取基础目录，返回其中已存在的条目名称"""
+        try:
+            with os.scandir(self.base_dir) as entries:
+                return {entry.name for entry in entries}
+        except FileNotFoundError:
+            return set()
     
     def list_models(self):
         """列出所有支持的模型"""
-        print("\n支持的模型列表:")
-        print("=" * 60)
+        present = self._get_present_models()
+        logger.info("\n支持的模型列表:")
+        logger.info("=" * 60)
         for name, config in MODEL_CONFIGS.items():
-            status = "✅ 已下载" if (self.base_dir / name).exists() else "⏳ 未下载"
-            print(f"模型名称: {name}")
-            print(f"描述: {config['description']}")
-            print(f"大小: {config['size']}")
-            print(f"状态: {status}")
-            print("-" * 40)
+            status = "✅ 已下载" if name in present else "⏳ 未下载"
+            logger.info(f"模型名称: {name}")
+            logger.info(f"描述: {config['description']}")
+            logger.info(f"大小: {config['size']}")
+            logger.info(f"状态: {status}")
+            logger.info("-" * 40)
     
     def get_gpustack_config(self) -> str:
         """
@@ -143,9 +693,10 @@ class ModelDownloader:
         config_lines.append("# 将下载的模型添加到 gpustack 中:")
         config_lines.append("")
         
-        for model_name in MODEL_CONFIGS.keys():
-            model_path = self.base_dir / model_name
-            if model_path.exists():
+        present = self._get_present_models()
+        for model_name in ALL_MODELS:
+            if model_name in present:
+                model_path = self.base_dir / model_name
                 config_lines.append(f"# {model_name}:")
                 config_lines.append(f"# 模型路径: {model_path.absolute()}")
                 config_lines.append(f"# 在 gpustack 界面中添加本地模型，指向上述路径")
@@ -165,6 +716,16 @@ def main():
   python download_models.py qwen3-14b bge-m3          # 下载多个模型
   python download_models.py --all --force             # 强制重新下载所有模型
   python download_models.py --config                  # 显示 gpustack 配置信息
+  python download_models.py --all --endpoint https://hf-mirror.com  # 通过国内镜像下载
+
+Xet 存储:
+  安装 hf_xet 后，huggingface_hub 会自动对 Xet 仓库按内容分块下载并复用本地已有分块。
+  在容器中运行时请将 $HF_HOME（默认 ~/.cache/huggingface，分块缓存位于其下的 xet 目录）
+  挂载到持久化卷，以便重启后仍可复用缓存，避免重复传输。
+
+hf_transfer:
+  需单独安装（pip install hf_transfer），通过 --hf-transfer 或 HF_HUB_ENABLE_HF_TRANSFER=1 启用。
+  启用后中断的下载无法断点续传，已下载的部分会被丢弃。
         """
     )
     
@@ -209,48 +770,84 @@ def main():
         help="Hugging Face 访问令牌（用于私有模型）"
     )
     
-    args = parser.parse_args()
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=16,
+        help="单个模型并发下载的文件数（默认: 16）"
+    )
+    
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="使用 model_info.json 中记录的 xxh3 校验值校验已下载的文件，校验失败的文件将重新下载"
+    )
     
-    # 创建下载器
-    downloader = ModelDownloader(args.base_dir, args.hf_token)
+    parser.add_argument(
+        "--hf-transfer",
+        action="store_true",
+        help="使用 hf_transfer 加速下载（需安装 hf_transfer，不支持断点续传）"
+    )
     
-    # 处理不同的命令
-    if args.list:
-        downloader.list_models()
-        return
+    parser.add_argument(
+        "--endpoint",
+        default=os.environ.get("HF_ENDPOINT"),
+        help="Hugging Face 服务地址，国内可使用 https://hf-mirror.com（默认读取 HF_ENDPOINT 环境变量）"
+    )
     
-    if args.config:
-        print(downloader.get_gpustack_config())
-        return
+    args = parser.parse_args()
     
-    # 确定要下载的模型
-    if args.all:
-        models_to_download = list(MODEL_CONFIGS.keys())
-    elif args.models:
-        models_to_download = args.models
-    else:
-        parser.print_help()
-        return
+    log_listener = start_log_listener()
+    try:
+        run(parser, args)
+    finally:
+        log_listener.stop()
+
+def run(parser: argparse.ArgumentParser, args: argparse.Namespace):
+    """根据命令行参数执行对应操作"""
+    # huggingface_hub 在每次下载时读取该开关，运行时设置即可生效
+    if args.hf_transfer:
+        hf_constants.HF_HUB_ENABLE_HF_TRANSFER = True
     
-    # 下载模型
-    print(f"准备下载 {len(models_to_download)} 个模型...")
-    results = downloader.download_models(models_to_download, args.force)
+    # 创建下载器，退出时等待模型信息文件写入完成
+    with ModelDownloader(args.base_dir, args.hf_token, args.workers, args.endpoint, args.verify) as downloader:
+        # 处理不同的命令
+        if args.list:
+            downloader.list_models()
+            return
+        
+        if args.config:
+            logger.info(downloader.get_gpustack_config())
+            return
+        
+        # 确定要下载的模型
+        if args.all:
+            models_to_download = ALL_MODELS
+        elif args.models:
+            models_to_download = args.models
+        else:
+            parser.print_help()
+            return
+        
+        # 下载模型
+        logger.info(f"准备下载 {len(models_to_download)} 个模型...")
+        results = downloader.download_models(models_to_download, args.force)
     
     # 显示结果
-    print("\n下载结果:")
-    print("=" * 40)
+    logger.info("\n下载结果:")
+    logger.info("=" * 40)
     success_count = 0
     for model_name, success in results.items():
         status = "✅ 成功" if success else "❌ 失败"
-        print(f"{model_name}: {status}")
+        logger.info(f"{model_name}: {status}")
         if success:
             success_count += 1
     
-    print(f"\n总计: {success_count}/{len(results)} 个模型下载成功")
+    logger.info(f"\n总计: {success_count}/{len(results)} 个模型下载成功")
     
     if success_count > 0:
-        print("\n下载完成！现在可以在 gpustack 中添加这些本地模型。")
-        print("使用 --config 参数查看具体配置信息。")
+        logger.info("\n下载完成！现在可以在 gpustack 中添加这些本地模型。")
+        logger.info("使用 --config 参数查看具体配置信息。")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -79,7 +79,12 @@ def get_es_client():
     try:
         # 构建连接参数
         es_params = {
-            "hosts": [ES_CONFIG["host"]]
+            "hosts": [ES_CONFIG["host"]],
+            # 每个节点保持的HTTP连接数，支持并发请求复用连接
+            "connections_per_node": 25,
+            "retry_on_timeout": True,
+            # 启用gzip压缩，分块文本（尤其中文）压缩率高，减少传输量
+            "http_compress": True
         }
                 
         # 如果提供了用户名和密码，添加认证信息